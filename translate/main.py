@@ -13,7 +13,7 @@ from dotenv import load_dotenv
 # 添加src目录到Python路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.translation_agent import TranslationAgent
+from src.translation_agent import TranslationAgent, AgentConfig
 
 
 def setup_environment():
@@ -38,21 +38,29 @@ def setup_environment():
         print(f"✅ 已找到配置文件: {config_file}")
 
 
-def translate_single_file(args):
-    """翻译单个文件"""
-    print(f"🚀 启动智能翻译代理...")
-    print(f"📁 输入文件: {args.input}")
-    
-    # 创建翻译代理
-    agent = TranslationAgent(
+def build_agent_config(args) -> AgentConfig:
+    """根据命令行参数构建翻译代理配置"""
+    return AgentConfig(
         model_name=args.model,
         translator_id=args.translator,
         max_tokens=args.max_tokens,
         provider=args.provider,
-        openai_api_key=getattr(args, 'openai_api_key', None),
-        openai_base_url=getattr(args, 'openai_base_url', None),
-        qwen_api_key=getattr(args, 'qwen_api_key', None)
+        openai_api_key=args.openai_api_key,
+        openai_base_url=args.openai_base_url,
+        qwen_api_key=args.qwen_api_key,
+        semantic_cache=args.semantic_cache,
+        requests_per_minute=args.rpm,
+        use_cache=not args.no_cache
     )
+
+
+def translate_single_file(args, config: AgentConfig):
+    """翻译单个文件"""
+    print(f"🚀 启动智能翻译代理...")
+    print(f"📁 输入文件: {args.input}")
+    
+    # 创建翻译代理
+    agent = TranslationAgent.from_config(config)
     
     try:
         # 执行翻译
@@ -73,29 +81,22 @@ def translate_single_file(args):
         sys.exit(1)
 
 
-def translate_batch(args):
+def translate_batch(args, config: AgentConfig):
     """批量翻译"""
     print(f"🚀 启动批量翻译...")
     print(f"📁 输入目录: {args.input}")
     print(f"📁 输出目录: {args.output}")
     
     # 创建翻译代理
-    agent = TranslationAgent(
-        model_name=args.model,
-        translator_id=args.translator,
-        max_tokens=args.max_tokens,
-        provider=args.provider,
-        openai_api_key=getattr(args, 'openai_api_key', None),
-        openai_base_url=getattr(args, 'openai_base_url', None),
-        qwen_api_key=getattr(args, 'qwen_api_key', None)
-    )
+    agent = TranslationAgent.from_config(config)
     
     try:
         # 执行批量翻译
         results = agent.batch_translate(
             input_dir=args.input,
             output_dir=args.output,
-            file_pattern=args.pattern
+            file_pattern=args.pattern,
+            max_files_concurrent=args.max_files_concurrent
         )
         
         # 统计结果
@@ -113,18 +114,12 @@ def translate_batch(args):
         sys.exit(1)
 
 
-def validate_translation(args):
+def validate_translation(args, config: AgentConfig):
     """验证翻译质量"""
     print(f"🔍 验证翻译质量...")
     
     # 创建翻译代理
-    agent = TranslationAgent(
-        translator_id=args.translator, 
-        provider=args.provider,
-        openai_api_key=getattr(args, 'openai_api_key', None),
-        openai_base_url=getattr(args, 'openai_base_url', None),
-        qwen_api_key=getattr(args, 'qwen_api_key', None)
-    )
+    agent = TranslationAgent.from_config(config)
     
     try:
         result = agent.validate_translation(args.original, args.translated)
@@ -201,6 +196,24 @@ def main():
         help='Qwen API密钥（优先级高于配置文件）'
     )
     
+    parser.add_argument(
+        '--semantic-cache',
+        action='store_true',
+        help='启用语义缓存，复用相近段落的译文（需安装 sentence-transformers 和 faiss-cpu）'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='不读取也不写入磁盘翻译缓存（默认缓存于 ~/.cache/translator）'
+    )
+    
+    parser.add_argument(
+        '--rpm',
+        type=int,
+        help='每分钟最多发出的请求数（默认按提供商: openai 3500, qwen 1200）'
+    )
+    
     # 创建子命令
     subparsers = parser.add_subparsers(dest='command', help='可用命令')
     
@@ -214,6 +227,7 @@ def main():
     batch_parser.add_argument('input', help='输入目录路径')
     batch_parser.add_argument('output', help='输出目录路径')
     batch_parser.add_argument('--pattern', default='*.md', help='文件匹配模式 (默认: *.md)')
+    batch_parser.add_argument('--max-files-concurrent', type=int, default=4, help='同时翻译的最大文件数 (默认: 4)')
     
     # 验证命令
     validate_parser = subparsers.add_parser('validate', help='验证翻译质量')
@@ -230,13 +244,15 @@ def main():
     # 设置环境
     setup_environment()
     
+    config = build_agent_config(args)
+    
     # 执行相应的命令
     if args.command == 'translate':
-        translate_single_file(args)
+        translate_single_file(args, config)
     elif args.command == 'batch':
-        translate_batch(args)
+        translate_batch(args, config)
     elif args.command == 'validate':
-        validate_translation(args)
+        validate_translation(args, config)
 
 
 if __name__ == "__main__":
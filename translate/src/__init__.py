@@ -2,21 +2,26 @@
 初始化模块
 """
 
-from .translation_agent import TranslationAgent
+from .translation_agent import TranslationAgent, AgentConfig
 from .markdown_parser import MarkdownParser, Metadata
 from .translator import SmartTranslator
 from .text_chunker import MarkdownChunker, TextChunk
 from .summary_generator import SummaryGenerator
+from .translation_cache import TranslationCache
+from .semantic_cache import SemanticCache
 
 __version__ = "1.0.0"
 __author__ = "Translation Agent Developer"
 
 __all__ = [
     "TranslationAgent",
+    "AgentConfig",
     "MarkdownParser",
     "Metadata",
     "SmartTranslator",
     "MarkdownChunker",
     "TextChunk",
-    "SummaryGenerator"
+    "SummaryGenerator",
+    "TranslationCache",
+    "SemanticCache"
 ]
\ No newline at end of file
@@ -4,6 +4,7 @@
 
 import os
 import configparser
+from functools import cached_property
 from typing import Dict, Optional
 from pathlib import Path
 
@@ -33,20 +34,28 @@ class ConfigManager:
             print(f"已加载配置文件: {config_file}")
         else:
             print("📝 未找到配置文件，将使用参数传递模式")
+        
+        # 按提供商分派的配置校验
+        self._validators = {
+            'openai': self._validate_openai,
+            'qwen': self._validate_qwen,
+            'auto': self._validate_auto,
+        }
     
-    def get_openai_config(self, api_key: str = None, base_url: str = None) -> Dict[str, Optional[str]]:
-
+    @cached_property
+    def _openai(self) -> Dict[str, Optional[str]]:
+        """
+        配置文件和环境变量中的OpenAI配置（首次使用时解析，之后复用）
+        """
         config = {
-            'api_key': api_key,
-            'base_url': base_url
+            'api_key': None,
+            'base_url': None
         }
 
-        if not api_key and self.config.has_section('openai'):
+        if self.config.has_section('openai'):
             config['api_key'] = self.config.get('openai', 'api_key', fallback=None)
             if config['api_key'] == 'your_openai_api_key_here':
                 config['api_key'] = None
-        
-        if not base_url and self.config.has_section('openai'):
             config['base_url'] = self.config.get('openai', 'base_url', fallback='https://api.openai.com/v1')
 
         if not config['api_key']:
@@ -56,15 +65,16 @@ class ConfigManager:
         
         return config
     
-    def get_qwen_config(self, api_key: str = None) -> Dict[str, Optional[str]]:
+    @cached_property
+    def _qwen(self) -> Dict[str, Optional[str]]:
         """
-        Qwen配置
+        配置文件和环境变量中的Qwen配置（首次使用时解析，之后复用）
         """
         config = {
-            'api_key': api_key
+            'api_key': None
         }
 
-        if not api_key and self.config.has_section('qwen'):
+        if self.config.has_section('qwen'):
             config['api_key'] = self.config.get('qwen', 'api_key', fallback=None)
             if config['api_key'] == 'your_dashscope_api_key_here':
                 config['api_key'] = None
@@ -74,9 +84,10 @@ class ConfigManager:
         
         return config
     
-    def get_default_config(self) -> Dict[str, str]:
+    @cached_property
+    def _defaults(self) -> Dict[str, str]:
         """
-        获取默认配置
+        配置文件和环境变量中的默认配置（首次使用时解析，之后复用）
         """
         defaults = {
             'model_name': 'gpt-3.5-turbo',
@@ -95,33 +106,48 @@ class ConfigManager:
         
         return defaults
     
+    def get_openai_config(self, api_key: str = None, base_url: str = None) -> Dict[str, Optional[str]]:
+
+        # 参数优先级高于配置文件和环境变量
+        return {
+            'api_key': api_key or self._openai['api_key'],
+            'base_url': base_url or self._openai['base_url']
+        }
+    
+    def get_qwen_config(self, api_key: str = None) -> Dict[str, Optional[str]]:
+        """
+        Qwen配置
+        """
+        return {
+            'api_key': api_key or self._qwen['api_key']
+        }
+    
+    def get_default_config(self) -> Dict[str, str]:
+        """
+        获取默认配置
+        """
+        return dict(self._defaults)
+    
     def validate_config(self, provider: str, **kwargs) -> bool:
         """
         验证配置是否完整
         """
-        if provider.lower() == 'openai':
-            openai_config = self.get_openai_config(
-                api_key=kwargs.get('openai_api_key'),
-                base_url=kwargs.get('openai_base_url')
-            )
-            return bool(openai_config['api_key'])
-        
-        elif provider.lower() == 'qwen':
-            qwen_config = self.get_qwen_config(
-                api_key=kwargs.get('qwen_api_key')
-            )
-            return bool(qwen_config['api_key'])
-        
-        elif provider.lower() == 'auto':
-            openai_valid = bool(self.get_openai_config(
-                api_key=kwargs.get('openai_api_key')
-            )['api_key'])
-            qwen_valid = bool(self.get_qwen_config(
-                api_key=kwargs.get('qwen_api_key')
-            )['api_key'])
-            return openai_valid or qwen_valid
-        
-        return False
+        validator = self._validators.get(provider.lower())
+        return validator(kwargs) if validator else False
+    
+    def _validate_openai(self, kwargs: Dict) -> bool:
+        return bool(self.get_openai_config(
+            api_key=kwargs.get('openai_api_key'),
+            base_url=kwargs.get('openai_base_url')
+        )['api_key'])
+    
+    def _validate_qwen(self, kwargs: Dict) -> bool:
+        return bool(self.get_qwen_config(
+            api_key=kwargs.get('qwen_api_key')
+        )['api_key'])
+    
+    def _validate_auto(self, kwargs: Dict) -> bool:
+        return self._validate_openai(kwargs) or self._validate_qwen(kwargs)
     
     def create_sample_config(self, config_path: str = None):
 
@@ -3,15 +3,151 @@ LLM工厂 - 支持多种模型提供商
 """
 
 import os
-import json
+import time
+import asyncio
+import threading
+import weakref
+import importlib.util
 from typing import Optional, Any, List, Dict, Union
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain.llms.base import LLM
+from langchain.schema.runnable import RunnableLambda
 from pydantic import Field
 
 from .config_manager import config_manager
 
 
+# 进程内共享的HTTP客户端，所有LLM实例复用同一个连接池
+_HTTP_LIMITS = {"max_connections": 64, "max_keepalive_connections": 32}
+_http_client_lock = threading.Lock()
+_shared_http_client = None
+_shared_async_http_client = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2需要安装h2: pip install httpx[http2]"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_shared_http_client():
+    """
+    获取共享的同步httpx客户端（首次调用时创建）
+    """
+    global _shared_http_client
+    with _http_client_lock:
+        if _shared_http_client is None:
+            _shared_http_client = httpx.Client(
+                http2=_http2_available(),
+                limits=httpx.Limits(**_HTTP_LIMITS)
+            )
+        return _shared_http_client
+
+
+class _LoopLocalAsyncTransport(httpx.AsyncBaseTransport):
+    """
+    按事件循环分别维护连接池
+
+    同步接口每次通过asyncio.run创建新的事件循环，连接不能跨循环复用，
+    否则会使用绑定在已关闭循环上的连接
+    """
+    
+    def __init__(self, **transport_kwargs):
+        self._transport_kwargs = transport_kwargs
+        # 事件循环被回收时对应的连接池一并释放
+        self._transports = weakref.WeakKeyDictionary()
+    
+    def _current_transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(**self._transport_kwargs)
+            self._transports[loop] = transport
+        return transport
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._current_transport().handle_async_request(request)
+    
+    async def aclose(self) -> None:
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+class _RateLimiter:
+    """
+    线程安全的令牌桶，同步与异步调用共用同一份配额
+    
+    每次请求预约一个令牌并返回需要等待的秒数，不依赖事件循环，
+    因此可以跨线程、跨asyncio.run共享
+    """
+    
+    def __init__(self, requests_per_minute: int):
+        self._lock = threading.Lock()
+        self._tokens = float(requests_per_minute)
+        self._last = time.monotonic()
+        self.set_rate(requests_per_minute)
+    
+    def set_rate(self, requests_per_minute: int):
+        with self._lock:
+            self.capacity = float(requests_per_minute)
+            self.rate = requests_per_minute / 60.0
+            self._tokens = min(self._tokens, self.capacity)
+    
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # 令牌不足时记为负数，后续请求依次排队
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+    
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+    
+    async def aacquire(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+# 每个提供商一个限流器，进程内所有LLM实例共用
+_rate_limiters: Dict[str, _RateLimiter] = {}
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, requests_per_minute: int) -> _RateLimiter:
+    """
+    获取提供商对应的共享限流器，速率以最近一次配置为准
+    """
+    with _rate_limiter_lock:
+        limiter = _rate_limiters.get(provider)
+        if limiter is None:
+            limiter = _rate_limiters[provider] = _RateLimiter(requests_per_minute)
+        elif limiter.capacity != requests_per_minute:
+            limiter.set_rate(requests_per_minute)
+        return limiter
+
+
+def get_shared_async_http_client():
+    """
+    获取共享的异步httpx客户端（首次调用时创建，连接池按事件循环隔离）
+    """
+    global _shared_async_http_client
+    with _http_client_lock:
+        if _shared_async_http_client is None:
+            _shared_async_http_client = httpx.AsyncClient(
+                transport=_LoopLocalAsyncTransport(
+                    http2=_http2_available(),
+                    limits=httpx.Limits(**_HTTP_LIMITS)
+                )
+            )
+        return _shared_async_http_client
+
+
 class QwenChatModel(LLM):
     """
     Qwen模型的LangChain兼容包装器 - 使用OpenAI SDK
@@ -20,12 +156,14 @@ class QwenChatModel(LLM):
     model: str = Field(default="qwen-plus", description="模型名称")
     temperature: float = Field(default=0.1, description="生成的随机性")
     client: Any = Field(default=None, description="OpenAI客户端")
+    async_client: Any = Field(default=None, description="OpenAI异步客户端")
     
     class Config:
         """Pydantic配置"""
         arbitrary_types_allowed = True
     
-    def __init__(self, model: str = "qwen-plus", temperature: float = 0.1, api_key: str = None, **kwargs):
+    def __init__(self, model: str = "qwen-plus", temperature: float = 0.1, api_key: str = None,
+                 http_client: Any = None, http_async_client: Any = None, **kwargs):
         """
         初始化Qwen模型
         
@@ -33,9 +171,11 @@ class QwenChatModel(LLM):
             model: 模型名称 (qwen-plus, qwen-max, qwen-turbo)
             temperature: 生成的随机性
             api_key: API密钥（可选，优先级高于配置文件）
+            http_client: httpx客户端（可选，用于复用连接池）
+            http_async_client: 异步httpx客户端（可选，用于复用连接池）
         """
         try:
-            from openai import OpenAI
+            from openai import OpenAI, AsyncOpenAI
         except ImportError:
             raise ImportError("请安装 openai: pip install openai>=1.0.0")
         
@@ -48,6 +188,12 @@ class QwenChatModel(LLM):
         client = OpenAI(
             api_key=qwen_config['api_key'],
             base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            http_client=http_client,
+        )
+        async_client = AsyncOpenAI(
+            api_key=qwen_config['api_key'],
+            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
+            http_client=http_async_client,
         )
         
         # 调用父类初始化
@@ -55,14 +201,22 @@ class QwenChatModel(LLM):
             model=model,
             temperature=temperature,
             client=client,
+            async_client=async_client,
             **kwargs
         )
     
     def _safe_format_messages(self, messages: Union[str, List, Any]) -> List[Dict[str, str]]:
+        """
+        将prompt转换为OpenAI消息格式（invoke与ainvoke共用，保留system角色）
+        """
 
         if isinstance(messages, str):
             return [{"role": "user", "content": messages}]
 
+        # ChatPromptValue：展开为消息列表，保留system角色
+        if hasattr(messages, 'to_messages'):
+            messages = messages.to_messages()
+
         if hasattr(messages, 'format'):
             formatted_content = str(messages)
             return [{"role": "user", "content": formatted_content}]
@@ -100,7 +254,7 @@ class QwenChatModel(LLM):
         """返回LLM类型"""
         return "qwen"
     
-    def _call(self, prompt: str, stop: Optional[List[str]] = None, **kwargs) -> str:
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> str:
 
         try:
             # 调用Qwen
@@ -134,6 +288,23 @@ class QwenChatModel(LLM):
                 
         except Exception as e:
             raise Exception(f"Qwen模型调用出错: {str(e)}")
+    
+    async def ainvoke(self, input, config=None, **kwargs):
+        try:
+            formatted_messages = self._safe_format_messages(input)
+            
+            # 异步调用Qwen API
+            completion = await self.async_client.chat.completions.create(
+                model=self.model,
+                messages=formatted_messages,
+                temperature=self.temperature,
+                **kwargs
+            )
+            
+            return completion.choices[0].message.content
+                
+        except Exception as e:
+            raise Exception(f"Qwen模型调用出错: {str(e)}")
 
 
 class QwenResponse:
@@ -163,6 +334,12 @@ class QwenResponse:
 
 class LLMFactory:
     
+    # 各提供商默认的每分钟请求数上限
+    DEFAULT_REQUESTS_PER_MINUTE = {
+        "openai": 3500,
+        "qwen": 1200
+    }
+    
     @staticmethod
     def get_supported_models() -> Dict[str, List[str]]:
         """获取支持的模型列表"""
@@ -187,13 +364,8 @@ class LLMFactory:
         }
     
     @staticmethod
-    def create_llm(model_name: str, 
-                   provider: str = "auto", 
-                   temperature: float = 0.1,
-                   openai_api_key: Optional[str] = None,
-                   qwen_api_key: Optional[str] = None,
-                   **kwargs):
-
+    def resolve_provider(model_name: str, provider: str = "auto") -> str:
+        """根据模型名称确定提供商"""
         if provider == "auto":
             supported_models = LLMFactory.get_supported_models()
             for provider_name, models in supported_models.items():
@@ -203,14 +375,63 @@ class LLMFactory:
             
             if provider == "auto":
                 raise ValueError(f"无法自动识别模型 {model_name} 的提供商")
+        
+        return provider
+    
+    @staticmethod
+    def with_rate_limit(llm, provider: str, requests_per_minute: Optional[int] = None):
+        """
+        为LLM的同步和异步调用加上令牌桶限流，在发出请求前主动等待，避免触发429
+        
+        Args:
+            llm: LLM实例
+            provider: 提供商名称，同一提供商的所有LLM实例共用一个限流器
+            requests_per_minute: 每分钟最多发出的请求数（默认按提供商取值，为0时不限流）
+        """
+        if requests_per_minute is None:
+            requests_per_minute = LLMFactory.DEFAULT_REQUESTS_PER_MINUTE.get(provider)
+        if not requests_per_minute:
+            return llm
+        
+        limiter = get_rate_limiter(provider, requests_per_minute)
+        
+        def invoke(input, config=None):
+            limiter.acquire()
+            return llm.invoke(input, config)
+        
+        async def ainvoke(input, config=None):
+            await limiter.aacquire()
+            return await llm.ainvoke(input, config)
+        
+        return RunnableLambda(invoke, afunc=ainvoke)
+    
+    @staticmethod
+    def create_llm(model_name: str, 
+                   provider: str = "auto", 
+                   temperature: float = 0.1,
+                   openai_api_key: Optional[str] = None,
+                   qwen_api_key: Optional[str] = None,
+                   http_client: Optional[Any] = None,
+                   http_async_client: Optional[Any] = None,
+                   **kwargs):
+
+        provider = LLMFactory.resolve_provider(model_name, provider)
+
+        # 未指定客户端时使用进程内共享的连接池
+        if http_client is None:
+            http_client = get_shared_http_client()
+        if http_async_client is None:
+            http_async_client = get_shared_async_http_client()
 
         if provider == "openai":
             return LLMFactory._create_openai_llm(
-                model_name, temperature, openai_api_key, **kwargs
+                model_name, temperature, openai_api_key,
+                http_client=http_client, http_async_client=http_async_client, **kwargs
             )
         elif provider == "qwen":
             return LLMFactory._create_qwen_llm(
-                model_name, temperature, qwen_api_key, **kwargs
+                model_name, temperature, qwen_api_key,
+                http_client=http_client, http_async_client=http_async_client, **kwargs
             )
         else:
             raise ValueError(f"不支持的提供商: {provider}")
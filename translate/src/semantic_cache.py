@@ -0,0 +1,145 @@
+"""
+语义缓存
+对措辞相近（空白、大小写、轻微改写）的文本复用已有译文
+"""
+
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, Set
+
+
+class SemanticCache:
+    """
+    基于向量相似度的翻译缓存：FAISS索引 + sqlite存储译文
+    
+    不同模型、温度、prompt模板的译文互不复用，每个scope单独维护一个索引
+    """
+    
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 model_name: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                 threshold: float = 0.93):
+        """
+        初始化语义缓存
+        
+        Args:
+            cache_dir: 缓存目录（默认: ~/.cache/translator）
+            model_name: 句向量模型名称
+            threshold: 余弦相似度阈值，达到该值才复用译文
+        """
+        try:
+            import faiss
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError("请安装语义缓存依赖: pip install sentence-transformers faiss-cpu")
+        
+        self._faiss = faiss
+        self.threshold = threshold
+        self.encoder = SentenceTransformer(model_name)
+        
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / ".cache" / "translator"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, object] = {}
+        self._dirty: Set[str] = set()
+        
+        self._db = sqlite3.connect(str(self.cache_dir / "semantic.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS scoped_entries ("
+            "scope TEXT, id INTEGER, content TEXT, translation TEXT, PRIMARY KEY (scope, id))"
+        )
+        self._db.commit()
+    
+    @staticmethod
+    def _scope_id(scope: str) -> str:
+        """将scope（模型|温度|模板）压缩为适合做文件名的短哈希"""
+        return hashlib.blake2b(scope.encode('utf-8'), digest_size=8).hexdigest()
+    
+    def _index_file(self, scope_id: str) -> Path:
+        return self.cache_dir / f"semantic-{scope_id}.faiss"
+    
+    def _get_index(self, scope_id: str):
+        """
+        获取scope对应的FAISS索引（首次使用时从磁盘加载或新建），调用方需持有锁
+        """
+        index = self._indexes.get(scope_id)
+        if index is not None:
+            return index
+        
+        index_file = self._index_file(scope_id)
+        if index_file.exists():
+            index = self._faiss.read_index(str(index_file))
+        else:
+            index = self._faiss.IndexFlatIP(self.encoder.get_sentence_embedding_dimension())
+        
+        # 索引未及时保存时，丢弃sqlite中多出的记录，保证两者行号一致
+        self._db.execute(
+            "DELETE FROM scoped_entries WHERE scope = ? AND id >= ?", (scope_id, index.ntotal)
+        )
+        self._db.commit()
+        
+        self._indexes[scope_id] = index
+        return index
+    
+    def embed(self, text: str):
+        """
+        计算归一化的句向量，内积即余弦相似度
+        
+        超过模型最大输入长度的文本会被截断，开头相同的长文本几乎得到相同向量，
+        此时返回None，不参与语义缓存
+        """
+        # 预留句首、句尾特殊token的位置
+        if len(self.encoder.tokenizer.tokenize(text)) > self.encoder.max_seq_length - 2:
+            return None
+        return self.encoder.encode([text], normalize_embeddings=True).astype('float32')
+    
+    def lookup(self, embedding, scope: str) -> Optional[str]:
+        """
+        在scope内查找最相似的已翻译文本，相似度低于阈值时返回None
+        """
+        scope_id = self._scope_id(scope)
+        with self._lock:
+            index = self._get_index(scope_id)
+            if index.ntotal == 0:
+                return None
+            scores, ids = index.search(embedding, 1)
+            if scores[0][0] < self.threshold:
+                return None
+            row = self._db.execute(
+                "SELECT translation FROM scoped_entries WHERE scope = ? AND id = ?",
+                (scope_id, int(ids[0][0]))
+            ).fetchone()
+        
+        return row[0] if row else None
+    
+    def add(self, content: str, translation: str, scope: str, embedding=None):
+        """
+        在scope内写入一条翻译记录
+        """
+        if embedding is None:
+            embedding = self.embed(content)
+            if embedding is None:
+                return
+        
+        scope_id = self._scope_id(scope)
+        with self._lock:
+            index = self._get_index(scope_id)
+            row_id = index.ntotal
+            index.add(embedding)
+            self._db.execute(
+                "INSERT INTO scoped_entries (scope, id, content, translation) VALUES (?, ?, ?, ?)",
+                (scope_id, row_id, content, translation)
+            )
+            self._db.commit()
+            self._dirty.add(scope_id)
+    
+    def save(self):
+        """
+        将FAISS索引持久化到磁盘
+        """
+        with self._lock:
+            for scope_id in self._dirty:
+                self._faiss.write_index(self._indexes[scope_id], str(self._index_file(scope_id)))
+            self._dirty.clear()
@@ -22,8 +22,10 @@ class SummaryGenerator:
     """摘要生成器"""
     
     def __init__(self, model_name: str = "gpt-3.5-turbo", temperature: float = 0.2, provider: str = None,
-                 openai_api_key: str = None, openai_base_url: str = None, qwen_api_key: str = None):
+                 openai_api_key: str = None, openai_base_url: str = None, qwen_api_key: str = None,
+                 requests_per_minute: int = None):
 
+        # 使用独立的LLM实例（摘要温度与翻译不同），HTTP连接池在进程内共享
         self.llm = LLMFactory.create_llm(
             model_name=model_name,
             provider=provider,
@@ -32,6 +34,10 @@ class SummaryGenerator:
             openai_base_url=openai_base_url,
             qwen_api_key=qwen_api_key
         )
+        # 与翻译器共用提供商级别的限流器
+        self.llm = LLMFactory.with_rate_limit(
+            self.llm, LLMFactory.resolve_provider(model_name, provider or "auto"), requests_per_minute
+        )
         
         # 原文摘要prompt
         self.original_summary_template = ChatPromptTemplate.from_template(
@@ -128,6 +134,19 @@ class SummaryGenerator:
             print(f"生成原文摘要时出错: {e}")
             return f"摘要生成失败: {str(e)}"
     
+    async def agenerate_original_summary(self, content: str) -> str:
+        """
+        异步生成原文摘要
+        """
+        try:
+            summary = await self.original_summary_chain.ainvoke({
+                "content": content
+            })
+            return summary
+        except Exception as e:
+            print(f"生成原文摘要时出错: {e}")
+            return f"摘要生成失败: {str(e)}"
+    
     def generate_translated_summary(self, content: str) -> str:
         """
         生成译文摘要
@@ -147,6 +166,19 @@ class SummaryGenerator:
             print(f"生成译文摘要时出错: {e}")
             return f"摘要生成失败: {str(e)}"
     
+    async def agenerate_translated_summary(self, content: str) -> str:
+        """
+        异步生成译文摘要
+        """
+        try:
+            summary = await self.translated_summary_chain.ainvoke({
+                "content": content
+            })
+            return summary
+        except Exception as e:
+            print(f"生成译文摘要时出错: {e}")
+            return f"摘要生成失败: {str(e)}"
+    
     def compare_summaries(self, original_summary: str, translated_summary: str) -> dict:
         """
         比较原文摘要和译文摘要，找出遗漏内容
@@ -164,31 +196,28 @@ class SummaryGenerator:
                 "translated_summary": translated_summary
             })
             
-            # 解析比较结果
-            lines = comparison_result.split('\n')
-            result = {
+            return self._parse_comparison(comparison_result)
+            
+        except Exception as e:
+            print(f"比较摘要时出错: {e}")
+            return {
                 "completeness_score": 0,
-                "missing_content": "",
+                "missing_content": f"比较失败: {str(e)}",
                 "suggestions": "",
-                "raw_result": comparison_result
+                "raw_result": f"比较失败: {str(e)}"
             }
+    
+    async def acompare_summaries(self, original_summary: str, translated_summary: str) -> dict:
+        """
+        异步比较原文摘要和译文摘要
+        """
+        try:
+            comparison_result = await self.comparison_chain.ainvoke({
+                "original_summary": original_summary,
+                "translated_summary": translated_summary
+            })
             
-            for line in lines:
-                line = line.strip()
-                if line.startswith("- 完整性评分："):
-                    try:
-                        # 提取分数
-                        score_part = line.split("：")[1]
-                        score = int(''.join(filter(str.isdigit, score_part)))
-                        result["completeness_score"] = score
-                    except:
-                        pass
-                elif line.startswith("- 遗漏内容："):
-                    result["missing_content"] = line.split("：", 1)[1] if "：" in line else ""
-                elif line.startswith("- 建议："):
-                    result["suggestions"] = line.split("：", 1)[1] if "：" in line else ""
-            
-            return result
+            return self._parse_comparison(comparison_result)
             
         except Exception as e:
             print(f"比较摘要时出错: {e}")
@@ -199,6 +228,36 @@ class SummaryGenerator:
                 "raw_result": f"比较失败: {str(e)}"
             }
     
+    def _parse_comparison(self, comparison_result: str) -> dict:
+        """
+        解析摘要比较结果
+        """
+        # 解析比较结果
+        lines = comparison_result.split('\n')
+        result = {
+            "completeness_score": 0,
+            "missing_content": "",
+            "suggestions": "",
+            "raw_result": comparison_result
+        }
+        
+        for line in lines:
+            line = line.strip()
+            if line.startswith("- 完整性评分："):
+                try:
+                    # 提取分数
+                    score_part = line.split("：")[1]
+                    score = int(''.join(filter(str.isdigit, score_part)))
+                    result["completeness_score"] = score
+                except:
+                    pass
+            elif line.startswith("- 遗漏内容："):
+                result["missing_content"] = line.split("：", 1)[1] if "：" in line else ""
+            elif line.startswith("- 建议："):
+                result["suggestions"] = line.split("：", 1)[1] if "：" in line else ""
+        
+        return result
+    
     def generate_chunk_summaries(self, chunks: List[TextChunk]) -> List[str]:
 
         summaries = []
@@ -3,11 +3,37 @@
 """
 
 import re
-import tiktoken
-from typing import List, Dict, Tuple
+import functools
+from typing import List, Dict, Tuple, Iterable, Iterator
 from dataclasses import dataclass
 
 
+@functools.lru_cache(maxsize=4)
+def _get_encoding(model: str):
+    """
+    获取模型对应的tiktoken编码器，同一模型在进程内只加载一次
+    """
+    # 延迟导入，不需要分块的命令（如validate）不必加载tiktoken
+    import tiktoken
+
+    try:
+        # 尝试直接获取模型对应的编码器
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # 如果模型不支持，使用默认的cl100k_base编码器
+        # 这个编码器适用于GPT-3.5和GPT-4系列
+        if model.lower().startswith('qwen'):
+            # Qwen模型使用cl100k_base编码器
+            return tiktoken.get_encoding("cl100k_base")
+        elif model.lower().startswith('gpt-4'):
+            return tiktoken.get_encoding("cl100k_base")
+        elif model.lower().startswith('gpt-3.5'):
+            return tiktoken.get_encoding("cl100k_base")
+        else:
+            # 默认使用cl100k_base
+            return tiktoken.get_encoding("cl100k_base")
+
+
 @dataclass
 class TextChunk:
     """文本块结构"""
@@ -37,22 +63,7 @@ class MarkdownChunker:
     
     def _get_encoding(self, model: str):
 
-        try:
-            # 尝试直接获取模型对应的编码器
-            return tiktoken.encoding_for_model(model)
-        except KeyError:
-            # 如果模型不支持，使用默认的cl100k_base编码器
-            # 这个编码器适用于GPT-3.5和GPT-4系列
-            if model.lower().startswith('qwen'):
-                # Qwen模型使用cl100k_base编码器
-                return tiktoken.get_encoding("cl100k_base")
-            elif model.lower().startswith('gpt-4'):
-                return tiktoken.get_encoding("cl100k_base")
-            elif model.lower().startswith('gpt-3.5'):
-                return tiktoken.get_encoding("cl100k_base")
-            else:
-                # 默认使用cl100k_base
-                return tiktoken.get_encoding("cl100k_base")
+        return _get_encoding(model)
     
     def count_tokens(self, text: str) -> int:
         """计算文本的token数量"""
@@ -211,19 +222,29 @@ class MarkdownChunker:
         """
         合并小文本块
         """
-        merged_chunks = []
+        return list(self.iter_merged_chunks(chunks))
+    
+    def iter_merged_chunks(self, chunks: Iterable[TextChunk]) -> Iterator[TextChunk]:
+        """
+        逐个产出合并后的文本块，每个块确定后立即返回
+        """
         current_merged = None
+        current_tokens = 0
+        separator_tokens = self.count_tokens('\n\n')
         
         for chunk in chunks:
             chunk_tokens = self.count_tokens(chunk.content)
             
             if chunk_tokens > self.max_tokens:
                 if current_merged:
-                    merged_chunks.append(current_merged)
+                    yield current_merged
                     current_merged = None
 
                 split_chunks = self._split_large_chunk(chunk)
-                merged_chunks.extend(split_chunks)
+                yield from split_chunks[:-1]
+                # 最后一段通常较短，留作下一次合并的起点
+                current_merged = split_chunks[-1]
+                current_tokens = self.count_tokens(current_merged.content)
                 continue
 
             if current_merged is None:
@@ -234,18 +255,21 @@ class MarkdownChunker:
                     start_pos=chunk.start_pos,
                     end_pos=chunk.end_pos
                 )
+                current_tokens = chunk_tokens
                 continue
 
-            merged_content = current_merged.content + '\n\n' + chunk.content
-            merged_tokens = self.count_tokens(merged_content)
+            # 代码块与普通文本不合并，避免普通文本被当作代码只翻译注释
+            same_kind = (current_merged.chunk_type == 'code') == (chunk.chunk_type == 'code')
+            merged_tokens = current_tokens + separator_tokens + chunk_tokens
             
-            if merged_tokens <= self.max_tokens:
+            if same_kind and merged_tokens <= self.max_tokens:
 
-                current_merged.content = merged_content
+                current_merged.content = current_merged.content + '\n\n' + chunk.content
                 current_merged.end_pos = chunk.end_pos
+                current_tokens = merged_tokens
             else:
 
-                merged_chunks.append(current_merged)
+                yield current_merged
                 current_merged = TextChunk(
                     content=chunk.content,
                     chunk_type=chunk.chunk_type,
@@ -253,11 +277,10 @@ class MarkdownChunker:
                     start_pos=chunk.start_pos,
                     end_pos=chunk.end_pos
                 )
+                current_tokens = chunk_tokens
         
         if current_merged:
-            merged_chunks.append(current_merged)
-        
-        return merged_chunks
+            yield current_merged
     
     def _split_large_chunk(self, chunk: TextChunk) -> List[TextChunk]:
         """
@@ -297,6 +320,12 @@ class MarkdownChunker:
         
         return split_chunks if split_chunks else [chunk]
     
+    def iter_chunks(self, content: str) -> Iterator[TextChunk]:
+        """
+        流式分块，供翻译流水线边分块边翻译
+        """
+        yield from self.iter_merged_chunks(self.split_by_structure(content))
+    
     def chunk_text(self, content: str) -> List[TextChunk]:
         """
         主要的分块方法
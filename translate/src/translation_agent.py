@@ -3,13 +3,35 @@
 """
 
 import os
+import asyncio
 from typing import Dict, Optional, List, Tuple
 from pathlib import Path
-import json
+from dataclasses import dataclass, asdict
+from functools import cached_property
+import orjson
 
 from .markdown_parser import MarkdownParser, Metadata
 from .translator import SmartTranslator
 from .text_chunker import MarkdownChunker
+from .semantic_cache import SemanticCache
+
+# 统计信息与批量报告的JSON输出格式（非ASCII字符原样输出）
+_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+
+
+@dataclass(frozen=True, slots=True)
+class AgentConfig:
+    """翻译代理配置（命令行参数解析后构建一次）"""
+    model_name: str = "gpt-3.5-turbo"
+    translator_id: str = "FILL_YOUR_GITHUB_ID_HERE"
+    max_tokens: int = 800
+    provider: Optional[str] = None
+    openai_api_key: Optional[str] = None
+    openai_base_url: Optional[str] = None
+    qwen_api_key: Optional[str] = None
+    semantic_cache: bool = False
+    requests_per_minute: Optional[int] = None
+    use_cache: bool = True
 
 
 class TranslationAgent:
@@ -22,21 +44,60 @@ class TranslationAgent:
                  provider: str = None,
                  openai_api_key: str = None,
                  openai_base_url: str = None,
-                 qwen_api_key: str = None):
+                 qwen_api_key: str = None,
+                 semantic_cache: bool = False,
+                 requests_per_minute: int = None,
+                 use_cache: bool = True):
         """
         初始化翻译代理
         """
+        self.config = AgentConfig(
+            model_name=model_name,
+            translator_id=translator_id,
+            max_tokens=max_tokens,
+            provider=provider,
+            openai_api_key=openai_api_key,
+            openai_base_url=openai_base_url,
+            qwen_api_key=qwen_api_key,
+            semantic_cache=semantic_cache,
+            requests_per_minute=requests_per_minute,
+            use_cache=use_cache
+        )
         self.translator_id = translator_id
         self.model_name = model_name
         self.provider = provider
         self.parser = MarkdownParser()
-        self.translator = SmartTranslator(
-            model_name, provider=provider,
-            openai_api_key=openai_api_key,
-            openai_base_url=openai_base_url,
-            qwen_api_key=qwen_api_key
+    
+    @classmethod
+    def from_config(cls, config: AgentConfig) -> "TranslationAgent":
+        """
+        根据AgentConfig创建翻译代理
+        """
+        return cls(**asdict(config))
+    
+    @cached_property
+    def translator(self) -> SmartTranslator:
+        """
+        翻译器（首次使用时创建LLM客户端）
+        """
+        return SmartTranslator(
+            self.config.model_name, provider=self.config.provider,
+            openai_api_key=self.config.openai_api_key,
+            openai_base_url=self.config.openai_base_url,
+            qwen_api_key=self.config.qwen_api_key,
+            semantic_cache=SemanticCache() if self.config.semantic_cache else None,
+            requests_per_minute=self.config.requests_per_minute,
+            max_tokens=self.config.max_tokens,
+            use_cache=self.config.use_cache
         )
-        
+    
+    @cached_property
+    def summary_generator(self):
+        """
+        摘要生成器（与翻译器共用同一个实例）
+        """
+        return self.translator.summary_generator
+    
     def translate_file(self, 
                       input_file: str, 
                       output_file: Optional[str] = None,
@@ -44,6 +105,15 @@ class TranslationAgent:
         """
         翻译Markdown文件
         """
+        return asyncio.run(self.atranslate_file(input_file, output_file, save_stats))
+    
+    async def atranslate_file(self, 
+                             input_file: str, 
+                             output_file: Optional[str] = None,
+                             save_stats: bool = True) -> Dict:
+        """
+        异步翻译Markdown文件
+        """
         if not os.path.exists(input_file):
             raise FileNotFoundError(f"输入文件不存在: {input_file}")
         
@@ -55,7 +125,7 @@ class TranslationAgent:
         print(f"原作者: {metadata.author}")
         print(f"文档长度: {len(content)} 字符")
         
-        translated_content, stats = self.translator.translate_content(content)
+        translated_content, stats = await self.translator.atranslate_content(content)
 
         updated_metadata = self.parser.update_translation_metadata( #元数据更新1
             metadata, self.translator_id
@@ -115,10 +185,21 @@ class TranslationAgent:
     def batch_translate(self, 
                        input_dir: str, 
                        output_dir: str,
-                       file_pattern: str = "*.md") -> List[Dict]:
+                       file_pattern: str = "*.md",
+                       max_files_concurrent: int = 4) -> List[Dict]:
         """
         批量翻译文件
         """
+        return asyncio.run(self.abatch_translate(input_dir, output_dir, file_pattern, max_files_concurrent))
+    
+    async def abatch_translate(self, 
+                              input_dir: str, 
+                              output_dir: str,
+                              file_pattern: str = "*.md",
+                              max_files_concurrent: int = 4) -> List[Dict]:
+        """
+        异步批量翻译文件，多个文件并发处理
+        """
         input_path = Path(input_dir)
         output_path = Path(output_dir)
 
@@ -132,27 +213,32 @@ class TranslationAgent:
         
         print(f"找到 {len(files)} 个文件需要翻译")
         
-        results = []
+        # 限制同时处理的文件数，请求速率由翻译器的限流器控制
+        semaphore = asyncio.Semaphore(max(1, max_files_concurrent))
         
-        for file_path in files:
-            print(f"\n处理文件 {len(results) + 1}/{len(files)}: {file_path.name}")
-            
+        async def translate_one(index: int, file_path: Path) -> Dict:
             try:
-                output_file = output_path / f"{file_path.stem}_translated.md"
-                stats = self.translate_file(str(file_path), str(output_file))
-                results.append(stats)
+                async with semaphore:
+                    print(f"\n处理文件 {index}/{len(files)}: {file_path.name}")
+                    output_file = output_path / f"{file_path.stem}_translated.md"
+                    return await self.atranslate_file(str(file_path), str(output_file))
                 
             except Exception as e:
                 print(f"翻译文件 {file_path} 时出错: {e}")
-                results.append({
+                return {
                     "input_file": str(file_path),
                     "error": str(e),
                     "completeness_score": 0
-                })
+                }
+        
+        results = await asyncio.gather(
+            *(translate_one(i, file_path) for i, file_path in enumerate(files, 1))
+        )
+        results = list(results)
 
         report_file = output_path / "batch_translation_report.json"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        with open(report_file, 'wb') as f:
+            f.write(orjson.dumps(results, option=_JSON_OPTIONS))
         
         print(f"\n批量翻译完成，报告保存至: {report_file}")
         
@@ -163,8 +249,8 @@ class TranslationAgent:
         保存翻译统计信息
         """
         try:
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                json.dump(stats, f, ensure_ascii=False, indent=2)
+            with open(stats_file, 'wb') as f:
+                f.write(orjson.dumps(stats, option=_JSON_OPTIONS))
             print(f"翻译统计信息已保存至: {stats_file}")
         except Exception as e:
             print(f"保存统计信息时出错: {e}")
@@ -205,10 +291,10 @@ class TranslationAgent:
         _, translated_content = self.parser.parse_file(translated_file)
         
         # 生成摘要并比较
-        original_summary = self.translator.summary_generator.generate_original_summary(original_content)
-        translated_summary = self.translator.summary_generator.generate_translated_summary(translated_content)
+        original_summary = self.summary_generator.generate_original_summary(original_content)
+        translated_summary = self.summary_generator.generate_translated_summary(translated_content)
         
-        comparison_result = self.translator.summary_generator.compare_summaries(
+        comparison_result = self.summary_generator.compare_summaries(
             original_summary, translated_summary
         )
         
@@ -0,0 +1,75 @@
+"""
+翻译缓存
+对完全相同的内容复用已有译文，避免重复调用LLM
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+# 默认磁盘缓存目录，与语义缓存同在 ~/.cache/translator 下
+DEFAULT_CACHE_DIR = str(Path.home() / ".cache" / "translator" / "translations")
+
+
+class TranslationCache:
+    """翻译结果缓存：内存LRU + 可选的磁盘持久化"""
+    
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_CACHE_DIR, max_memory_items: int = 10000):
+        """
+        初始化翻译缓存
+        
+        Args:
+            cache_dir: 磁盘缓存目录，为None时仅使用内存缓存
+            max_memory_items: 内存缓存的最大条目数
+        """
+        self.max_memory_items = max_memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        
+        if cache_dir:
+            try:
+                import diskcache
+                self._disk = diskcache.Cache(cache_dir)
+            except ImportError:
+                print("📝 未安装 diskcache，翻译缓存仅保存在内存中: pip install diskcache")
+    
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """根据模型、模板、原文等信息生成缓存键"""
+        return hashlib.blake2b('|'.join(parts).encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        查询缓存，未命中返回None
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        
+        if self._disk is not None:
+            value = self._disk.get(key)
+            if value is not None:
+                self._remember(key, value)
+                return value
+        
+        return None
+    
+    def set(self, key: str, value: str):
+        """
+        写入缓存
+        """
+        self._remember(key, value)
+        if self._disk is not None:
+            self._disk.set(key, value)
+    
+    def _remember(self, key: str, value: str):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            if len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
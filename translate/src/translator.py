@@ -2,10 +2,20 @@
 翻译器
 """
 
-from typing import List, Dict, Tuple
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import BaseOutputParser
+from typing import List, Dict, Tuple, Optional
+from dataclasses import dataclass, field
+from collections import Counter
+from functools import cached_property
+from langchain.prompts import (
+    ChatPromptTemplate,
+    SystemMessagePromptTemplate,
+    HumanMessagePromptTemplate
+)
+from langchain.schema import BaseOutputParser, AIMessage
 from tqdm import tqdm
+import asyncio
+import threading
+import math
 import re
 import os
 
@@ -13,46 +23,46 @@ from .text_chunker import TextChunk, MarkdownChunker
 from .summary_generator import SummaryGenerator
 from .markdown_parser import Metadata
 from .llm_factory import LLMFactory
+from .translation_cache import TranslationCache
+from .semantic_cache import SemanticCache
+
+
+# 代码中的注释行：缩进 + 以 # 或 // 开头的注释（不含行尾空白，替换时保留行尾空白和\r）
+_COMMENT_RE = re.compile(r'^([ \t]*)((?://|#).*?)[ \t\r]*$', re.MULTILINE)
+
+# 批量注释翻译结果中的编号行，格式为 <编号>|<译文>
+_NUMBERED_LINE_RE = re.compile(r'^\s*(\d+)\|(.*)$', re.MULTILINE)
+
+
+def _char_bigrams(text: str) -> Counter:
+    """统计文本的字符二元组（忽略空白和大小写），同时适用于中英文"""
+    text = re.sub(r'\s+', '', text.lower())
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
 
 
 class TranslationOutputParser(BaseOutputParser):
     """翻译输出解析"""
     
     def parse(self, text) -> str:
-        if hasattr(text, 'content'):
+        # 常见类型直接判断，避免hasattr在每个文本块上的异常开销
+        if isinstance(text, str):
+            return text.strip()
+        if isinstance(text, AIMessage):
             return text.content.strip()
-        elif hasattr(text, 'text'):
-            return text.text.strip()
-        else:
-            return str(text).strip()
+        content = getattr(text, 'content', None)
+        if content is not None:
+            return content.strip()
+        text_value = getattr(text, 'text', None)
+        if text_value is not None:
+            return text_value.strip()
+        return str(text).strip()
 
 
-class SmartTranslator:
-    """翻译"""
-    
-    def __init__(self, model_name: str = "gpt-3.5-turbo", temperature: float = 0.1, provider: str = None, 
-                 openai_api_key: str = None, openai_base_url: str = None, qwen_api_key: str = None):
-
-        # 使用LLM_factory创建模型实例
-        self.llm = LLMFactory.create_llm(
-            model_name=model_name,
-            provider=provider,
-            temperature=temperature,
-            openai_api_key=openai_api_key,
-            openai_base_url=openai_base_url,
-            qwen_api_key=qwen_api_key
-        )
-        self.model_name = model_name
-        
-        self.chunker = MarkdownChunker(max_tokens=800, model=model_name)
-        self.summary_generator = SummaryGenerator(
-            model_name, temperature=0.2, provider=provider,
-            openai_api_key=openai_api_key, openai_base_url=openai_base_url, qwen_api_key=qwen_api_key
-        )
-        
-        # 翻译prompt模板
-        self.translation_template = ChatPromptTemplate.from_template(
-            """你是一个专业的英译汉翻译专家，具有深厚的语言功底和跨文化理解能力。
+# 翻译prompt模板
+# 固定的翻译要求放在system消息中，各分块请求共享相同前缀，便于服务端前缀缓存命中
+TRANSLATION_TEMPLATE = ChatPromptTemplate.from_messages([
+    SystemMessagePromptTemplate.from_template(
+        """你是一个专业的英译汉翻译专家，具有深厚的语言功底和跨文化理解能力。
 
 翻译要求：
 1. 准确传达原文的含义和语调
@@ -62,43 +72,183 @@ class SmartTranslator:
 5. 对于代码、URL、专有名词等，保持原文不变
 6. 确保翻译的流畅性和可读性
 
-请翻译以下内容，只输出翻译结果，不要添加任何解释或说明：
-
-{content}
+请翻译用户提供的内容，只输出翻译结果，不要添加任何解释或说明。"""
+    ),
+    HumanMessagePromptTemplate.from_template(
+        """{content}
 
 翻译结果："""
-        )
-        
-        # 重新翻译prompt模板（用于处理遗漏内容）
-        self.retranslation_template = ChatPromptTemplate.from_template(
-            """你是一个专业的英译汉翻译专家。现在需要你重新翻译以下内容，特别注意包含所有重要信息。
+    )
+])
+
+# 重新翻译prompt模板（用于处理遗漏内容）
+RETRANSLATION_TEMPLATE = ChatPromptTemplate.from_template(
+    """你是一个专业的英译汉翻译专家。现在需要你重新翻译以下内容，特别注意包含所有重要信息。
 
 原文：
 {original_text}
 
-之前的翻译存在遗漏，缺少以下内容：
+整篇文档之前的翻译存在遗漏，缺少以下内容（不一定出现在本段原文中）：
 {missing_content}
 
 请重新进行完整翻译，确保：
-1. 包含所有原文信息，特别是上述缺失的内容
+1. 包含所有原文信息；上述缺失内容只翻译本段原文中确实存在的部分，不要添加原文中没有的内容
 2. 保持Markdown格式完全不变
 3. 使用地道的中文表达
 4. 确保翻译的准确性和完整性
 
 只输出翻译结果："""
+)
+
+# 代码注释批量翻译prompt模板（一次请求翻译整个代码块的注释）
+COMMENT_BATCH_TEMPLATE = ChatPromptTemplate.from_template(
+    """你是一个专业的英译汉翻译专家。请逐行翻译以下代码注释。
+
+要求：
+1. 保留每行的注释符号（如 # 或 //）
+2. 保持原有编号，每行输出格式为 <编号>|<译文>
+3. 行数与原文一致，不要合并或拆分行
+
+{comments}
+
+只输出翻译结果："""
+)
+
+# 带上下文翻译prompt模板
+CONTEXT_TEMPLATE = ChatPromptTemplate.from_template(
+    """你是一个专业的英译汉翻译专家。
+
+上下文信息：
+{context}
+
+请翻译以下内容，考虑上下文的连贯性：
+
+{content}
+
+翻译结果："""
+)
+
+_PARSER = TranslationOutputParser()
+
+
+@dataclass
+class _InflightCall:
+    """同步路径下正在进行的翻译请求"""
+    event: threading.Event = field(default_factory=threading.Event)
+    result: Optional[str] = None
+    error: Optional[Exception] = None
+
+
+class SmartTranslator:
+    """翻译"""
+    
+    def __init__(self, model_name: str = "gpt-3.5-turbo", temperature: float = 0.1, provider: str = None, 
+                 openai_api_key: str = None, openai_base_url: str = None, qwen_api_key: str = None,
+                 max_concurrency: int = 8, cache: TranslationCache = None,
+                 semantic_cache: SemanticCache = None, http_client=None,
+                 requests_per_minute: int = None, max_tokens: int = 800, use_cache: bool = True):
+
+        # 使用LLM_factory创建模型实例，未传入http_client时使用共享连接池
+        self.llm = LLMFactory.create_llm(
+            model_name=model_name,
+            provider=provider,
+            temperature=temperature,
+            openai_api_key=openai_api_key,
+            openai_base_url=openai_base_url,
+            qwen_api_key=qwen_api_key,
+            http_client=http_client
+        )
+        
+        # 按提供商的每分钟请求数上限主动限流，与摘要生成器共用同一配额
+        self.llm = LLMFactory.with_rate_limit(
+            self.llm, LLMFactory.resolve_provider(model_name, provider or "auto"), requests_per_minute
         )
         
+        self.model_name = model_name
+        self.temperature = temperature
+        # 每个请求的文本块token预算，相邻小块会在预算内合并
+        self.max_tokens = max_tokens
+        # 并发翻译的最大请求数
+        self.max_concurrency = max(1, max_concurrency)
+        
+        self.summary_generator = SummaryGenerator(
+            model_name, temperature=0.2, provider=provider,
+            openai_api_key=openai_api_key, openai_base_url=openai_base_url, qwen_api_key=qwen_api_key,
+            requests_per_minute=requests_per_minute
+        )
+        
+        # prompt模板在模块加载时创建一次，所有实例共用
+        self.translation_template = TRANSLATION_TEMPLATE
+        self.retranslation_template = RETRANSLATION_TEMPLATE
+        self.comment_batch_template = COMMENT_BATCH_TEMPLATE
+        
+        # 翻译结果缓存，模板内容参与缓存键计算；关闭磁盘缓存时仅在内存中复用本次运行的译文
+        if cache is None:
+            cache = TranslationCache() if use_cache else TranslationCache(cache_dir=None)
+        self.cache = cache
+        self._template_fingerprint = '\n'.join(
+            message.prompt.template for message in self.translation_template.messages
+        )
+        self._comment_template_fingerprint = self.comment_batch_template.messages[0].prompt.template
+        # 可选的语义缓存，用于复用相近段落的译文
+        self.semantic_cache = semantic_cache
+        # 语义缓存按模型、温度、模板分区，与精确缓存键保持一致
+        self._semantic_scope = '|'.join(
+            (self.model_name, str(self.temperature), self._template_fingerprint)
+        )
+        
+        # 正在进行中的翻译请求，按缓存键去重（异步任务 / 同步线程）
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._inflight_calls: Dict[str, _InflightCall] = {}
+        self._inflight_lock = threading.Lock()
+        
         # 创建处理链
         self.translation_chain = (
             self.translation_template 
             | self.llm 
-            | TranslationOutputParser()
+            | _PARSER
         )
         
         self.retranslation_chain = (
             self.retranslation_template 
             | self.llm 
-            | TranslationOutputParser()
+            | _PARSER
+        )
+        
+        self.comment_batch_chain = (
+            self.comment_batch_template 
+            | self.llm 
+            | _PARSER
+        )
+        
+        self.context_chain = (
+            CONTEXT_TEMPLATE 
+            | self.llm 
+            | _PARSER
+        )
+    
+    @cached_property
+    def chunker(self) -> MarkdownChunker:
+        """
+        文本分块器（首次使用时加载tokenizer）
+        """
+        return MarkdownChunker(max_tokens=self.max_tokens, model=self.model_name)
+    
+    def _cache_key(self, content: str) -> str:
+        """
+        生成翻译缓存键，模型、温度或模板变化时缓存自动失效
+        """
+        return TranslationCache.make_key(
+            self.model_name, str(self.temperature), self._template_fingerprint, content
+        )
+    
+    def _comment_cache_key(self, comment: str) -> str:
+        """
+        生成代码注释的缓存键，与普通文本分开，注释模板变化时同样失效
+        """
+        return TranslationCache.make_key(
+            self.model_name, str(self.temperature), 'comment',
+            self._comment_template_fingerprint, self._template_fingerprint, comment
         )
     
     def translate_chunk(self, chunk: TextChunk) -> str:
@@ -110,67 +260,323 @@ class SmartTranslator:
                 # 代码块特殊处理 - 只翻译注释
                 return self._translate_code_block(chunk.content)
             
-            translation = self.translation_chain.invoke({
-                "content": chunk.content
-            })
+            cache_key = self._cache_key(chunk.content)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            # 相同内容正在其他线程翻译时，等待其结果而不是重复请求
+            with self._inflight_lock:
+                call = self._inflight_calls.get(cache_key)
+                is_owner = call is None
+                if is_owner:
+                    call = self._inflight_calls[cache_key] = _InflightCall()
+            
+            if not is_owner:
+                call.event.wait()
+                if call.error is not None:
+                    raise call.error
+                return call.result
             
-            return translation
+            try:
+                call.result = self._translate_text(chunk.content, cache_key)
+                return call.result
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self._inflight_lock:
+                    self._inflight_calls.pop(cache_key, None)
+                call.event.set()
             
         except Exception as e:
             print(f"翻译文本块时出错: {e}")
             return f"翻译失败: {chunk.content}"
     
+    def _translate_text(self, content: str, cache_key: str) -> str:
+        """
+        调用LLM翻译普通文本，并写入缓存
+        """
+        embedding = None
+        if self.semantic_cache is not None:
+            embedding = self.semantic_cache.embed(content)
+        # 超长文本不参与语义缓存；相似匹配只是近似结果，不写入精确缓存
+        if embedding is not None:
+            cached = self.semantic_cache.lookup(embedding, self._semantic_scope)
+            if cached is not None:
+                return cached
+        
+        translation = self.translation_chain.invoke({
+            "content": content
+        })
+        self.cache.set(cache_key, translation)
+        if embedding is not None:
+            self.semantic_cache.add(content, translation, self._semantic_scope, embedding)
+        
+        return translation
+    
+    async def atranslate_chunk(self, chunk: TextChunk) -> str:
+        """
+        异步翻译单个文本块
+        """
+        try:
+            if chunk.chunk_type == 'code':
+                # 代码块特殊处理 - 只翻译注释
+                return await self._atranslate_code_block(chunk.content)
+            
+            cache_key = self._cache_key(chunk.content)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            # 相同内容只发起一次请求，其余调用共享同一个任务的结果
+            task = self._inflight.get(cache_key)
+            if task is None:
+                task = asyncio.ensure_future(self._atranslate_text(chunk.content, cache_key))
+                self._inflight[cache_key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+            
+            # shield避免某个调用方被取消时连带取消共享的任务
+            return await asyncio.shield(task)
+            
+        except Exception as e:
+            print(f"翻译文本块时出错: {e}")
+            return f"翻译失败: {chunk.content}"
+    
+    async def _atranslate_text(self, content: str, cache_key: str) -> str:
+        """
+        异步调用LLM翻译普通文本，并写入缓存
+        """
+        embedding = None
+        if self.semantic_cache is not None:
+            # 向量计算占用CPU，放到线程中避免阻塞事件循环
+            embedding = await asyncio.to_thread(self.semantic_cache.embed, content)
+        # 超长文本不参与语义缓存；相似匹配只是近似结果，不写入精确缓存
+        if embedding is not None:
+            cached = self.semantic_cache.lookup(embedding, self._semantic_scope)
+            if cached is not None:
+                return cached
+        
+        translation = await self.translation_chain.ainvoke({
+            "content": content
+        })
+        self.cache.set(cache_key, translation)
+        if embedding is not None:
+            self.semantic_cache.add(content, translation, self._semantic_scope, embedding)
+        
+        return translation
+    
+    def _extract_comments(self, code_content: str) -> List[Tuple[int, int, str, str]]:
+        """
+        收集代码中的注释行，返回 (起始位置, 结束位置, 缩进, 注释内容)
+        """
+        return [
+            (match.start(), match.end(2), match.group(1), match.group(2))
+            for match in _COMMENT_RE.finditer(code_content)
+        ]
+    
+    def _lookup_comments(self, comments: List[Tuple[int, int, str, str]]) -> Tuple[List, List[int]]:
+        """
+        从缓存中查找注释译文，返回 (译文列表, 未命中的下标)
+        """
+        translations = [self.cache.get(self._comment_cache_key(comment)) for _, _, _, comment in comments]
+        pending = [i for i, translation in enumerate(translations) if translation is None]
+        return translations, pending
+    
+    def _fill_comments(self, comments: List[Tuple[int, int, str, str]], translations: List,
+                       pending: List[int], results: List):
+        """
+        将新翻译的注释写回译文列表并更新缓存
+        """
+        for i, result in zip(pending, results):
+            # 译文丢失注释符号时会被当作代码写回，按失败处理并保留原文
+            if not isinstance(result, Exception) and not self._keeps_comment_marker(comments[i][3], result):
+                result = ValueError(f"译文缺少注释符号: {result}")
+            translations[i] = result
+            if not isinstance(result, Exception):
+                self.cache.set(self._comment_cache_key(comments[i][3]), result)
+    
+    def _build_comment_batch(self, comments: List[Tuple[int, int, str, str]], pending: List[int]) -> str:
+        """
+        将待翻译的注释拼接为带编号的多行文本
+        """
+        return '\n'.join(f"{n}|{comments[i][3]}" for n, i in enumerate(pending, 1))
+    
+    @staticmethod
+    def _keeps_comment_marker(comment: str, translation: str) -> bool:
+        """
+        检查译文是否保留了原注释的注释符号（# 或 //）
+        """
+        marker = '//' if comment.startswith('//') else '#'
+        return translation.startswith(marker)
+    
+    def _parse_comment_batch(self, response: str, comments: List[Tuple[int, int, str, str]],
+                             pending: List[int]) -> Optional[List[str]]:
+        """
+        按编号拆分批量翻译结果，编号缺失或注释符号丢失时返回None
+        """
+        parsed = {}
+        for match in _NUMBERED_LINE_RE.finditer(response):
+            parsed[int(match.group(1))] = match.group(2).strip()
+        
+        results = []
+        for n, i in enumerate(pending, 1):
+            translation = parsed.get(n)
+            if translation is None or not self._keeps_comment_marker(comments[i][3], translation):
+                return None
+            results.append(translation)
+        return results
+    
+    def _restore_comments(self, code_content: str, comments: List[Tuple[int, int, str, str]],
+                          translations: List) -> str:
+        """
+        将注释译文按原有缩进写回代码
+        """
+        parts = []
+        last_end = 0
+        for (start, end, indent, _), comment_translation in zip(comments, translations):
+            # 翻译失败的注释保留原文
+            if isinstance(comment_translation, Exception):
+                continue
+            # 保持原有的缩进
+            parts.append(code_content[last_end:start])
+            parts.append(indent + comment_translation)
+            last_end = end
+        parts.append(code_content[last_end:])
+        
+        return ''.join(parts)
+    
     def _translate_code_block(self, code_content: str) -> str:
         """
         翻译代码块，只翻译注释部分
         """
-        lines = code_content.split('\n')
-        translated_lines = []
+        comments = self._extract_comments(code_content)
+        if not comments:
+            return code_content
         
-        for line in lines:
-            # 如果是注释行，进行翻译
-            if line.strip().startswith('#') or line.strip().startswith('//'):
+        # 未命中缓存的注释合并为一次请求翻译
+        translations, pending = self._lookup_comments(comments)
+        if pending:
+            results = None
+            if len(pending) > 1:
                 try:
-                    comment_translation = self.translation_chain.invoke({
-                        "content": line.strip()
+                    response = self.comment_batch_chain.invoke({
+                        "comments": self._build_comment_batch(comments, pending)
                     })
-                    # 保持原有的缩进
-                    indent = len(line) - len(line.lstrip())
-                    translated_lines.append(' ' * indent + comment_translation)
-                except:
-                    translated_lines.append(line)
-            else:
-                translated_lines.append(line)
-        
-        return '\n'.join(translated_lines)
+                    results = self._parse_comment_batch(response, comments, pending)
+                except Exception as e:
+                    print(f"批量翻译注释时出错: {e}")
+            
+            # 解析失败时退回逐行翻译
+            if results is None:
+                results = self.translation_chain.batch(
+                    [{"content": comments[i][3]} for i in pending],
+                    config={"max_concurrency": self.max_concurrency},
+                    return_exceptions=True
+                )
+            self._fill_comments(comments, translations, pending, results)
+        
+        return self._restore_comments(code_content, comments, translations)
+    
+    async def _atranslate_code_block(self, code_content: str) -> str:
+        """
+        异步翻译代码块，只翻译注释部分
+        """
+        comments = self._extract_comments(code_content)
+        if not comments:
+            return code_content
+        
+        translations, pending = self._lookup_comments(comments)
+        if pending:
+            results = None
+            if len(pending) > 1:
+                try:
+                    response = await self.comment_batch_chain.ainvoke({
+                        "comments": self._build_comment_batch(comments, pending)
+                    })
+                    results = self._parse_comment_batch(response, comments, pending)
+                except Exception as e:
+                    print(f"批量翻译注释时出错: {e}")
+            
+            if results is None:
+                results = await self.translation_chain.abatch(
+                    [{"content": comments[i][3]} for i in pending],
+                    config={"max_concurrency": self.max_concurrency},
+                    return_exceptions=True
+                )
+            self._fill_comments(comments, translations, pending, results)
+        
+        return self._restore_comments(code_content, comments, translations)
     
     def translate_content(self, content: str) -> Tuple[str, Dict]:
         """
-        翻译完整内容
+        翻译完整内容（同步接口）
+        """
+        return asyncio.run(self.atranslate_content(content))
+    
+    async def atranslate_content(self, content: str) -> Tuple[str, Dict]:
+        """
+        异步翻译完整内容
         """
         print("开始分析和翻译文档...")
 
-        print("正在生成原文摘要...")
-        original_summary = self.summary_generator.generate_original_summary(content)
-
-        print("正在分割文本...")
-        chunks = self.chunker.chunk_text(content)
-        print(f"文本已分割为 {len(chunks)} 个块")
+        print("正在分割并翻译各个文本块，同时生成原文摘要...")
+        # 分块与翻译流水线：按结构切分全文后，合并得到的文本块逐个放入有界队列，
+        # K个翻译协程并发消费，首个块入队后即开始翻译，无需等待其余块合并完成
+        chunks: List[TextChunk] = []
+        results: Dict[int, str] = {}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_concurrency * 2)
+        # 块总数在分块过程中逐步确定，进度条总数随入队更新
+        progress = tqdm(total=0, desc="翻译进度")
+        
+        async def produce():
+            try:
+                for chunk in self.chunker.iter_chunks(content):
+                    chunks.append(chunk)
+                    progress.total = len(chunks)
+                    await queue.put((len(chunks) - 1, chunk))
+                    # 队列未满时put不会让出控制权，主动让出使翻译协程立即取走该块
+                    await asyncio.sleep(0)
+            finally:
+                for _ in range(self.max_concurrency):
+                    await queue.put(None)
         
-        print("正在翻译各个文本块...")
-        translated_chunks = []
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, chunk = item
+                try:
+                    results[index] = await self.atranslate_chunk(chunk)
+                except Exception as e:
+                    print(f"翻译文本块时出错: {e}")
+                    results[index] = f"翻译失败: {chunk.content}"
+                progress.update(1)
+        
+        # 原文摘要只依赖原文，与分块翻译同时进行
+        try:
+            original_summary, *_ = await asyncio.gather(
+                self.summary_generator.agenerate_original_summary(content),
+                produce(),
+                *(consume() for _ in range(self.max_concurrency))
+            )
+        finally:
+            progress.close()
+        print(f"文本已分割为 {len(chunks)} 个块")
         
-        for i, chunk in enumerate(tqdm(chunks, desc="翻译进度")):
-            translated_content = self.translate_chunk(chunk)
-            translated_chunks.append(translated_content)
+        translated_chunks = [results[i] for i in range(len(chunks))]
 
         translated_content = self._merge_translated_chunks(translated_chunks)
+        
+        if self.semantic_cache is not None:
+            self.semantic_cache.save()
 
         print("正在生成译文摘要...")
-        translated_summary = self.summary_generator.generate_translated_summary(translated_content)
+        translated_summary = await self.summary_generator.agenerate_translated_summary(translated_content)
 
         print("正在检查翻译完整性...")
-        comparison_result = self.summary_generator.compare_summaries(
+        comparison_result = await self.summary_generator.acompare_summaries(
             original_summary, translated_summary
         )
         
@@ -179,16 +585,16 @@ class SmartTranslator:
             print(f"遗漏内容: {comparison_result['missing_content']}")
             print("正在重新翻译...")
             
-            retranslated_content = self._retranslate_with_focus(
-                content, comparison_result["missing_content"]
+            retranslated_content = await self._retranslate_with_focus(
+                chunks, translated_chunks, comparison_result["missing_content"]
             )
             
             if retranslated_content:
                 translated_content = retranslated_content
 
-                translated_summary = self.summary_generator.generate_translated_summary(translated_content)
+                translated_summary = await self.summary_generator.agenerate_translated_summary(translated_content)
                 
-                comparison_result = self.summary_generator.compare_summaries(
+                comparison_result = await self.summary_generator.acompare_summaries(
                     original_summary, translated_summary
                 )
                 print(f"重新翻译后的完整性评分: {comparison_result['completeness_score']}/10")
@@ -207,45 +613,96 @@ class SmartTranslator:
         """
         合并文本块
         """
-        # 简单合并，用双换行分隔
-        return '\n\n'.join(chunk.strip() for chunk in translated_chunks if chunk.strip())
+        # 简单合并，用双换行分隔；每个块只strip一次
+        parts = []
+        for chunk in translated_chunks:
+            stripped = chunk.strip()
+            if stripped:
+                parts.append(stripped)
+        return '\n\n'.join(parts)
     
-    def _retranslate_with_focus(self, original_content: str, missing_content: str) -> str:
+    async def _retranslate_with_focus(self, chunks: List[TextChunk], translated_chunks: List[str],
+                                      missing_content: str, top_k: int = 3) -> Optional[str]:
         """
-        重新翻译缺失内容
+        只重新翻译与遗漏内容最相关的文本块，再重新合并全文
         """
-        try:
-            retranslated = self.retranslation_chain.invoke({
-                "original_text": original_content,
-                "missing_content": missing_content
-            })
-            return retranslated
-        except Exception as e:
-            print(f"重新翻译时出错: {e}")
+        candidates = self._rank_chunks_by_relevance(chunks, translated_chunks, missing_content)[:top_k]
+        if not candidates:
+            return None
+        
+        results = await self.retranslation_chain.abatch(
+            [{"original_text": chunks[i].content, "missing_content": missing_content} for i in candidates],
+            config={"max_concurrency": self.max_concurrency},
+            return_exceptions=True
+        )
+        
+        retranslated_chunks = list(translated_chunks)
+        updated = False
+        for i, result in zip(candidates, results):
+            if isinstance(result, Exception):
+                print(f"重新翻译时出错: {result}")
+                continue
+            # 重译结果受全文遗漏内容影响，不写入按块的翻译缓存
+            retranslated_chunks[i] = result
+            updated = True
+        
+        if not updated:
             return None
+        return self._merge_translated_chunks(retranslated_chunks)
+    
+    def _rank_chunks_by_relevance(self, chunks: List[TextChunk], translated_chunks: List[str],
+                                  missing_content: str, min_score: float = 0.1,
+                                  relative_cutoff: float = 0.5) -> List[int]:
+        """
+        按字符二元组TF-IDF余弦相似度，对文本块与遗漏内容的相关性排序（代码块除外）
+        
+        只返回相似度不低于min_score、且不低于最高分relative_cutoff倍的文本块，
+        避免仅有零星重合字符的文本块也被重新翻译
+        """
+        # 遗漏描述通常是中文并夹带英文术语，因此同时比较原文和译文
+        indices = [i for i, chunk in enumerate(chunks) if chunk.chunk_type != 'code']
+        if not indices:
+            return []
+        
+        documents = [_char_bigrams(chunks[i].content + '\n' + translated_chunks[i]) for i in indices]
+        query = _char_bigrams(missing_content)
+        
+        document_frequency = Counter()
+        for document in documents:
+            document_frequency.update(document.keys())
+        idf = {
+            term: math.log((len(documents) + 1) / (count + 1)) + 1
+            for term, count in document_frequency.items()
+        }
+        
+        def weigh(terms: Counter) -> Dict[str, float]:
+            return {term: count * idf.get(term, 0.0) for term, count in terms.items()}
+        
+        query_vector = weigh(query)
+        query_norm = math.sqrt(sum(w * w for w in query_vector.values()))
+        if query_norm == 0:
+            return []
+        
+        scores = []
+        for i, document in zip(indices, documents):
+            vector = weigh(document)
+            norm = math.sqrt(sum(w * w for w in vector.values()))
+            dot = sum(w * vector.get(term, 0.0) for term, w in query_vector.items())
+            scores.append((dot / (norm * query_norm) if norm else 0.0, i))
+        
+        scores.sort(key=lambda item: item[0], reverse=True)
+        if scores[0][0] < min_score:
+            return []
+        cutoff = max(min_score, scores[0][0] * relative_cutoff)
+        return [i for score, i in scores if score >= cutoff]
     
     def translate_with_context(self, content: str, context: str = "") -> str:
         """
         带上下文的翻译
         """
         if context:
-            enhanced_prompt = ChatPromptTemplate.from_template(
-                """你是一个专业的英译汉翻译专家。
-
-上下文信息：
-{context}
-
-请翻译以下内容，考虑上下文的连贯性：
-
-{content}
-
-翻译结果："""
-            )
-            
-            enhanced_chain = enhanced_prompt | self.llm | TranslationOutputParser()
-            
             try:
-                return enhanced_chain.invoke({
+                return self.context_chain.invoke({
                     "content": content,
                     "context": context
                 })